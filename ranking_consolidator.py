@@ -8,9 +8,86 @@ import csv
 import json
 import re
 import os
-from collections import defaultdict
+import sys
+from collections import Counter, defaultdict, deque
+from functools import lru_cache
+from itertools import islice
 from typing import Dict, List, Optional, Tuple
 
+# Line patterns for the text-based ranking sources
+_ESPN_RE = re.compile(r'(\d+)\.\s+([^,]+),\s+(\w+)\s+\(([A-Z]+)(\d+)\)')
+_NHL_RE = re.compile(r'(\d+)\.\s+([^,]+),\s+([A-Z]+),\s+(\w+)')
+_HH_RE = re.compile(r'(\d+)\t([^\t]*)\t([^\t]*)\t([^\t]*)')
+_YAHOO_TEAMPOS_RE = re.compile(r'([A-Z]{2,3})\s*-\s*([A-Z]+)')
+
+# FantasyPros filename tokens, checked in order, mapped to position
+_CSV_POSITION_TOKENS = (('_C_', 'C'), ('_LW_', 'LW'), ('_RW_', 'RW'), ('_D_', 'D'), ('_G_', 'G'))
+
+
+def _is_numeric_skip(line: str) -> bool:
+    """Check for Yahoo's numeric table cells: '12', '100%' or '1.2'."""
+    if line.endswith('%'):
+        return line[:-1].isdecimal()
+    whole, dot, fraction = line.partition('.')
+    return whole.isdecimal() and (not dot or fraction.isdecimal())
+
+
+def _with_lookahead(lines, size):
+    """Yield each line with a list of up to ``size`` lines that follow it."""
+    window = deque(maxlen=size + 1)
+    for line in lines:
+        window.append(line)
+        if len(window) == window.maxlen:
+            yield window[0], list(islice(window, 1, None))
+
+    # Drain the tail; a full window's head has already been yielded
+    if len(window) == window.maxlen:
+        window.popleft()
+    while window:
+        yield window.popleft(), list(window)
+
+
+def _reduce_groups(players):
+    """Accumulate per-name rank sums, counts and team/position tallies."""
+    # Group ids follow first appearance; the returned lists are indexed by them
+    group_index = {}
+    sum_overall = []
+    count_overall = []
+    sum_position = []
+    count_position = []
+    team_counts = []
+    position_counts = []
+    any_multi_position = []
+
+    for player in players:
+        g = group_index.get(player['name'])
+        if g is None:
+            g = group_index[player['name']] = len(group_index)
+            sum_overall.append(0)
+            count_overall.append(0)
+            sum_position.append(0)
+            count_position.append(0)
+            team_counts.append(Counter())
+            position_counts.append(Counter())
+            any_multi_position.append(False)
+
+        if player['overall_rank']:
+            sum_overall[g] += player['overall_rank']
+            count_overall[g] += 1
+        if player['position_rank']:
+            sum_position[g] += player['position_rank']
+            count_position[g] += 1
+        if player['team']:
+            team_counts[g][player['team']] += 1
+        if player['position']:
+            position_counts[g][player['position']] += 1
+        if player['multi_position']:
+            any_multi_position[g] = True
+
+    return (list(group_index), sum_overall, count_overall, sum_position,
+            count_position, team_counts, position_counts, any_multi_position)
+
+
 class RankingParser:
     def __init__(self):
         self.position_map = {
@@ -30,13 +107,60 @@ class RankingParser:
             'PHI': 'PHI', 'PIT': 'PIT', 'SEA': 'SEA', 'SJ': 'SJ', 'STL': 'STL',
             'TB': 'TB', 'TOR': 'TOR', 'UTA': 'UTA', 'VAN': 'VAN', 'VGK': 'VGK',
             'WPG': 'WPG', 'WSH': 'WSH',
-            # Alternative names
-            'TBL': 'TB', 'SJS': 'SJ', 'LAK': 'LAK', 'LAS': 'VGK', 'Wpg': 'WPG',
-            'Tor': 'TOR', 'Edm': 'EDM', 'Col': 'COL', 'Bos': 'BOS', 'Ott': 'OTT',
-            'Nsh': 'NSH', 'Dal': 'DAL'
+            # Alternative names (keys are upper case; lookups are normalized)
+            'TBL': 'TB', 'SJS': 'SJ', 'LAS': 'VGK', 'LA': 'LAK', 'MON': 'MTL',
+            'NAS': 'NSH', 'NJD': 'NJ', 'VEG': 'VGK', 'WAS': 'WSH'
+        }
+
+        # Intern team/position strings so every record shares one object
+        # per value and grouping compares by identity
+        self.team_abbreviations = {k: sys.intern(v) for k, v in self.team_abbreviations.items()}
+        self._position_intern = {p: sys.intern(p) for p in self.position_map}
+
+        # Line pattern and spec per text source; each spec lists
+        # (field, convert, group) triples that build a player record
+        # from the matching line's regex groups
+        self._text_formats = {
+            # "1. Nathan MacKinnon, Col (C1)"
+            'espn': (_ESPN_RE, (
+                ('name', self.normalize_name, 2),
+                ('team', self._lookup_team, 3),
+                ('position', self._intern_position, 4),
+                ('overall_rank', int, 1),
+                ('position_rank', int, 5),
+            )),
+            # "1. Nathan MacKinnon, F, COL"
+            'nhl': (_NHL_RE, (
+                ('name', self.normalize_name, 2),
+                ('team', self._lookup_team, 4),
+                ('position', self._intern_position, 3),
+                ('overall_rank', int, 1),
+                ('position_rank', int, 1),  # Will calculate properly later
+            )),
+            # Hockey Handbook table row: "1<TAB>Connor McDavid<TAB>C<TAB>EDM<TAB>..."
+            'hh': (_HH_RE, (
+                ('name', self.normalize_name, 2),
+                ('team', self._lookup_team, 4),
+                ('position', self._intern_position, 3),
+                ('overall_rank', int, 1),
+                ('position_rank', int, 1),  # Will calculate properly later
+            )),
         }
 
-    def normalize_name(self, name: str) -> str:
+    def _lookup_team(self, team: str) -> str:
+        """Map a team abbreviation (any case) to its canonical form."""
+        team = team.upper()
+        canonical = self.team_abbreviations.get(team)
+        return canonical if canonical is not None else sys.intern(team)
+
+    def _intern_position(self, position: str) -> str:
+        """Return the shared interned string for a position."""
+        interned = self._position_intern.get(position)
+        return interned if interned is not None else sys.intern(position)
+
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def normalize_name(name: str) -> str:
         """Normalize player name for matching across sources."""
         # Remove extra whitespace and convert to title case
         name = ' '.join(name.strip().split())
@@ -48,180 +172,98 @@ class RankingParser:
         """Parse FantasyPros CSV files."""
         players = []
 
+        # Extract position from filename
+        filename = os.path.basename(filepath)
+        position = next((pos for token, pos in _CSV_POSITION_TOKENS if token in filename), 'F')
+        multi_position = position == 'F'
+
         with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+            reader = csv.reader(f)
+            header = next(reader)
+            i_name = header.index('PLAYER NAME')
+            i_team = header.index('TEAM')
+            i_rank = header.index('RK')
+
             for row in reader:
-                name = self.normalize_name(row['PLAYER NAME'])
-                team = self.team_abbreviations.get(row['TEAM'], row['TEAM'])
-
-                # Extract position from filename
-                filename = os.path.basename(filepath)
-                if '_C_' in filename:
-                    position = 'C'
-                elif '_LW_' in filename:
-                    position = 'LW'
-                elif '_RW_' in filename:
-                    position = 'RW'
-                elif '_D_' in filename:
-                    position = 'D'
-                elif '_G_' in filename:
-                    position = 'G'
-                else:
-                    position = 'F'
+                if not row:
+                    continue
+
+                name = self.normalize_name(row[i_name])
+                team = self._lookup_team(row[i_team])
+                rank = int(row[i_rank])
 
                 players.append({
                     'name': name,
                     'team': team,
                     'position': position,
-                    'overall_rank': int(row['RK']),
-                    'position_rank': int(row['RK']),
-                    'multi_position': position == 'F'
+                    'overall_rank': rank,
+                    'position_rank': rank,
+                    'multi_position': multi_position
                 })
 
         return players
 
-    def parse_espn_text(self, filepath: str) -> List[Dict]:
-        """Parse ESPN format: '1. Nathan MacKinnon, Col (C1)'"""
-        players = []
-
-        with open(filepath, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line:
-                    continue
-
-                # Pattern: "1. Nathan MacKinnon, Col (C1)"
-                match = re.match(r'(\d+)\.\s+([^,]+),\s+(\w+)\s+\(([A-Z]+)(\d+)\)', line)
-                if match:
-                    overall_rank = int(match.group(1))
-                    name = self.normalize_name(match.group(2))
-                    team = self.team_abbreviations.get(match.group(3), match.group(3))
-                    position = match.group(4)
-                    position_rank = int(match.group(5))
-
-                    players.append({
-                        'name': name,
-                        'team': team,
-                        'position': position,
-                        'overall_rank': overall_rank,
-                        'position_rank': position_rank,
-                        'multi_position': position == 'F'
-                    })
-
-        return players
-
     def parse_yahoo_text(self, filepath: str) -> List[Dict]:
         """Parse Yahoo format (complex table)."""
         players = []
 
-        with open(filepath, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-
-        i = 0
         overall_rank = 1
 
-        while i < len(lines):
-            line = lines[i].strip()
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for line, next_lines in _with_lookahead((raw.strip() for raw in f), 4):
+                # Look for player name pattern (skip Photo lines)
+                if not line or line.startswith('Photo') or line.startswith('Player'):
+                    continue
 
-            # Look for player name pattern (skip Photo lines)
-            if line and not line.startswith('Photo') and not line.startswith('Player'):
                 # Check if this looks like a player name
-                if not re.match(r'^\d+$', line) and not re.match(r'^\d+%$', line) and not re.match(r'^\d+\.\d+$', line):
-                    name = self.normalize_name(line)
-
-                    # Look for team/position in next few lines
-                    team = None
-                    position = None
-
-                    for j in range(i+1, min(i+5, len(lines))):
-                        next_line = lines[j].strip()
-                        # Pattern: "EDM - C" or similar
-                        team_pos_match = re.match(r'([A-Z]{2,3})\s*-\s*([A-Z]+)', next_line)
-                        if team_pos_match:
-                            team = self.team_abbreviations.get(team_pos_match.group(1), team_pos_match.group(1))
-                            position = team_pos_match.group(2)
-                            break
-
-                    if team and position:
-                        # Determine position rank (simplified)
-                        position_rank = overall_rank  # We'll calculate this properly later
-
-                        players.append({
-                            'name': name,
-                            'team': team,
-                            'position': position,
-                            'overall_rank': overall_rank,
-                            'position_rank': position_rank,
-                            'multi_position': position in ['C', 'LW', 'RW']  # Yahoo allows multi-position
-                        })
-
-                        overall_rank += 1
-
-            i += 1
+                if _is_numeric_skip(line):
+                    continue
 
-        return players
+                name = self.normalize_name(line)
 
-    def parse_nhl_text(self, filepath: str) -> List[Dict]:
-        """Parse NHL.com format: '1. Nathan MacKinnon, F, COL'"""
-        players = []
+                # Look for team/position in next few lines
+                team = None
+                position = None
 
-        with open(filepath, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
+                for next_line in next_lines:
+                    # Pattern: "EDM - C" or similar
+                    team_pos_match = _YAHOO_TEAMPOS_RE.match(next_line)
+                    if team_pos_match:
+                        team = self._lookup_team(team_pos_match.group(1))
+                        position = self._intern_position(team_pos_match.group(2))
+                        break
 
-                # Pattern: "1. Nathan MacKinnon, F, COL"
-                match = re.match(r'(\d+)\.\s+([^,]+),\s+([A-Z]+),\s+(\w+)', line)
-                if match:
-                    overall_rank = int(match.group(1))
-                    name = self.normalize_name(match.group(2))
-                    position = match.group(3)
-                    team = self.team_abbreviations.get(match.group(4), match.group(4))
+                if team and position:
+                    # Determine position rank (simplified)
+                    position_rank = overall_rank  # We'll calculate this properly later
 
                     players.append({
                         'name': name,
                         'team': team,
                         'position': position,
                         'overall_rank': overall_rank,
-                        'position_rank': overall_rank,  # Will calculate properly later
-                        'multi_position': position == 'F'
+                        'position_rank': position_rank,
+                        'multi_position': position in ['C', 'LW', 'RW']  # Yahoo allows multi-position
                     })
 
+                    overall_rank += 1
+
         return players
 
-    def parse_hh_text(self, filepath: str) -> List[Dict]:
-        """Parse Hockey Handbook format (table with stats)."""
+    def _parse_text(self, filepath: str, pattern, spec) -> List[Dict]:
+        """Parse a one-player-per-line text format."""
         players = []
 
         with open(filepath, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Look for lines starting with rank number and containing player info
-            parts = line.split('\t')
-            if len(parts) >= 4 and parts[0].isdigit():
-                try:
-                    overall_rank = int(parts[0])
-                    name = self.normalize_name(parts[1])
-                    position = parts[2]
-                    team = self.team_abbreviations.get(parts[3], parts[3])
-
-                    players.append({
-                        'name': name,
-                        'team': team,
-                        'position': position,
-                        'overall_rank': overall_rank,
-                        'position_rank': overall_rank,  # Will calculate properly later
-                        'multi_position': position == 'F'
-                    })
-                except (ValueError, IndexError):
+            for line in f:
+                match = pattern.match(line.strip())
+                if not match:
                     continue
 
+                player = {field: convert(match.group(group)) for field, convert, group in spec}
+                player['multi_position'] = player['position'] == 'F'
+                players.append(player)
+
         return players
 
     def parse_file(self, filepath: str) -> List[Dict]:
@@ -231,13 +273,13 @@ class RankingParser:
         if filepath.endswith('.csv'):
             return self.parse_fantasyprops_csv(filepath)
         elif 'espn' in filename:
-            return self.parse_espn_text(filepath)
+            return self._parse_text(filepath, *self._text_formats['espn'])
         elif 'yahoo' in filename:
             return self.parse_yahoo_text(filepath)
         elif 'nhl' in filename:
-            return self.parse_nhl_text(filepath)
+            return self._parse_text(filepath, *self._text_formats['nhl'])
         elif 'hh' in filename:
-            return self.parse_hh_text(filepath)
+            return self._parse_text(filepath, *self._text_formats['hh'])
         else:
             print(f"Unknown format for file: {filepath}")
             return []
@@ -260,61 +302,41 @@ class RankingParser:
 
     def create_consensus_ranking(self, all_players: List[Dict]) -> List[Dict]:
         """Create consensus ranking from all sources."""
-        # Group players by normalized name
-        player_groups = defaultdict(list)
+        (names, sum_overall, count_overall, sum_position, count_position,
+         team_counts, position_counts, any_multi_position) = _reduce_groups(all_players)
 
-        for player in all_players:
-            player_groups[player['name']].append(player)
+        # Calculate average rankings as flat per-group lists
+        avg_overall = [round(total / count, 1) if count else 999
+                       for total, count in zip(sum_overall, count_overall)]
+        avg_position = [round(total / count, 1) if count else 999
+                        for total, count in zip(sum_position, count_position)]
 
-        consensus_players = []
+        # Order groups by average overall rank (stable sort over group ids)
+        order = sorted(range(len(names)), key=avg_overall.__getitem__)
 
-        for name, players in player_groups.items():
-            if not players:
-                continue
+        consensus_players = []
+        position_counter = defaultdict(int)
 
+        for consensus_rank, g in enumerate(order, 1):
             # Use the most common values for team/position
-            teams = [p['team'] for p in players if p['team']]
-            positions = [p['position'] for p in players if p['position']]
-
-            most_common_team = max(set(teams), key=teams.count) if teams else 'UNK'
-            most_common_position = max(set(positions), key=positions.count) if positions else 'F'
-
-            # Calculate average rankings
-            overall_ranks = [p['overall_rank'] for p in players if p['overall_rank']]
-            position_ranks = [p['position_rank'] for p in players if p['position_rank']]
+            most_common_team = team_counts[g].most_common(1)[0][0] if team_counts[g] else 'UNK'
+            most_common_position = position_counts[g].most_common(1)[0][0] if position_counts[g] else 'F'
 
-            avg_overall = sum(overall_ranks) / len(overall_ranks) if overall_ranks else 999
-            avg_position = sum(position_ranks) / len(position_ranks) if position_ranks else 999
-
-            # Check for multi-position eligibility
-            multi_position = any(p['multi_position'] for p in players)
+            # Players arrive in overall order, so a per-position counter
+            # yields the consensus position rank
+            position_counter[most_common_position] += 1
 
             consensus_players.append({
-                'name': name,
+                'name': names[g],
                 'team': most_common_team,
                 'position': most_common_position,
-                'multi_position_eligible': multi_position,
-                'overall_rank': round(avg_overall, 1),
-                'position_rank': round(avg_position, 1)
+                'multi_position_eligible': any_multi_position[g],
+                'overall_rank': avg_overall[g],
+                'position_rank': avg_position[g],
+                'consensus_overall_rank': consensus_rank,
+                'consensus_position_rank': position_counter[most_common_position]
             })
 
-        # Sort by average overall rank
-        consensus_players.sort(key=lambda x: x['overall_rank'])
-
-        # Assign final consensus ranks
-        for i, player in enumerate(consensus_players, 1):
-            player['consensus_overall_rank'] = i
-
-        # Assign consensus position ranks
-        by_position = defaultdict(list)
-        for player in consensus_players:
-            by_position[player['position']].append(player)
-
-        for position, pos_players in by_position.items():
-            pos_players.sort(key=lambda x: x['overall_rank'])
-            for i, player in enumerate(pos_players, 1):
-                player['consensus_position_rank'] = i
-
         return consensus_players
 
 def main():
@@ -351,8 +373,9 @@ def main():
         'players': consensus_players
     }
 
+    # Compact output lets json use its C encoder; write it in one call
     with open('consensus_rankings.json', 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+        f.write(json.dumps(output_data, ensure_ascii=False))
 
     print(f"\nConsensus rankings saved to consensus_rankings.json")
 